@@ -1,7 +1,12 @@
 import os
+import orjson
 from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from flask_caching import Cache
 from flask_sqlalchemy import SQLAlchemy
 from flask_marshmallow import Marshmallow
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import DeclarativeBase
 from logging.config import dictConfig
 
@@ -10,6 +15,19 @@ class Base(DeclarativeBase):
     pass
 
 
+class ORJSONProvider(DefaultJSONProvider):
+    """JSON provider that uses orjson, used by jsonify(), request.get_json() and the JSON error responses."""
+
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_SERIALIZE_NUMPY
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 # First create the db object using the SQLAlchemy constructor.
 # Pass a subclass of either DeclarativeBase or DeclarativeBaseNoMeta to the constructor.
 db = SQLAlchemy(model_class=Base)
@@ -17,6 +35,32 @@ db = SQLAlchemy(model_class=Base)
 # Create the Marshmallow instance after SQLAlchemy
 ma = Marshmallow()
 
+# Cache for the results of single region and event lookups
+cache = Cache()
+
+
+def set_sqlite_pragma(dbapi_connection, connection_record):
+    """Sets the SQLite pragmas for each new database connection.
+
+    WAL journal mode lets readers continue while another connection writes, and with synchronous=NORMAL a commit does
+    not wait for an fsync. Pages are read through a 256 MB memory map and a 64 MB page cache.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def is_memory_sqlite(uri):
+    """Returns True if the database URI is for an in-memory SQLite database."""
+    url = make_url(uri)
+    return url.get_backend_name() == "sqlite" and (
+        url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+    )
+
 
 def create_app(test_config=None):
     dictConfig({
@@ -41,11 +85,19 @@ def create_app(test_config=None):
 
     # create and configure the app
     app = Flask('paralympics', instance_relative_config=True)
+    app.json = ORJSONProvider(app)
     app.config.from_mapping(
         # Generate your own SECRET_KEY using python secrets
         SECRET_KEY='l-tirPCf1S44mWAGoWqWlA',
         # configure the SQLite database, relative to the app instance folder
         SQLALCHEMY_DATABASE_URI="sqlite:///" + os.path.join(app.instance_path, 'paralympics.sqlite'),
+        # Reject request bodies larger than 1 MB
+        MAX_CONTENT_LENGTH=1024 * 1024,
+        # Check each database connection before it is used and replace connections after 30 minutes
+        SQLALCHEMY_ENGINE_OPTIONS={"pool_pre_ping": True, "pool_recycle": 1800},
+        # In-memory cache in each app process, entries expire after 5 minutes
+        CACHE_TYPE="SimpleCache",
+        CACHE_DEFAULT_TIMEOUT=300,
     )
 
     if test_config is None:
@@ -55,6 +107,16 @@ def create_app(test_config=None):
         # load the test config if passed in
         app.config.from_mapping(test_config)
 
+    # Keep up to 30 database connections open for reuse between requests. In-memory SQLite databases use a single
+    # shared connection (StaticPool) which does not accept the pool size options. Options set in the config take
+    # precedence.
+    if not is_memory_sqlite(app.config["SQLALCHEMY_DATABASE_URI"]):
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+            "pool_size": 20,
+            "max_overflow": 10,
+            **app.config["SQLALCHEMY_ENGINE_OPTIONS"],
+        }
+
     # ensure the instance folder exists
     try:
         os.makedirs(app.instance_path)
@@ -67,12 +129,17 @@ def create_app(test_config=None):
     # Initialise Flask with the Marshmallow extension
     ma.init_app(app)
 
+    # Initialise Flask with the Flask-Caching extension
+    cache.init_app(app)
+
     # Models are defined in the models module, so you must import them before calling create_all, otherwise SQLAlchemy
     # will not know about them.
     from paralympics.models import User, Region, Event
     # Create the tables in the database
     # create_all does not update tables if they are already in the database.
     with app.app_context():
+        if db.engine.dialect.name == "sqlite":
+            event.listen(db.engine, "connect", set_sqlite_pragma)
         db.create_all()
 
         from paralympics.database_utils import add_data
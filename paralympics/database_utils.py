@@ -1,10 +1,13 @@
 # Different options for creating the database and adding data to the database
 import csv
+import secrets
 import sqlite3
 import pandas as pd
 from pathlib import Path
+from sqlalchemy import insert
 
 from paralympics import Region, Event
+from paralympics.models import DataVersion, versioned_tables
 
 # File locations
 db_file = Path(__file__).parent.joinpath("paralympics.sqlite")
@@ -167,6 +170,13 @@ def add_data(db):
     :param db: SQLAlchemy database for the app
     """
 
+    # Add the data versions before the data so that inserting the data increments them. Each version starts from a
+    # random number so that ETags given out for a previous database do not match.
+    for table_name in versioned_tables:
+        if not db.session.get(DataVersion, table_name):
+            db.session.add(DataVersion(table_name=table_name, version=secrets.randbelow(2 ** 31)))
+    db.session.commit()
+
     # If there are no regions in the database, then add them
     first_region = db.session.execute(db.select(Region)).first()
     if not first_region:
@@ -175,10 +185,10 @@ def add_data(db):
         with open(noc_file, 'r') as file:
             csv_reader = csv.reader(file)
             next(csv_reader)  # Skip header row
-            for row in csv_reader:
-                # row[0] is the first column, row[1] is the second column
-                r = Region(NOC=row[0], region=row[1], notes=row[2])
-                db.session.add(r)
+            # row[0] is the first column, row[1] is the second column
+            regions = [{"NOC": row[0], "region": row[1], "notes": row[2]} for row in csv_reader]
+            # Insert all the rows in a single executemany
+            db.session.execute(insert(Region), regions)
             db.session.commit()
 
     # If there are no Events, then add them
@@ -189,25 +199,26 @@ def add_data(db):
         with open(event_file, 'r') as file:
             csv_reader = csv.reader(file)
             next(csv_reader)  # Skip header row
-            for row in csv_reader:
-                # row[0] is the first column, row[1] is the second column etc
-                e = Event(type=row[0],
-                          year=row[1],
-                          country=row[2],
-                          host=row[3],
-                          NOC=row[4],
-                          start=row[5],
-                          end=row[6],
-                          duration=row[7] or None,
-                          disabilities_included=row[8],
-                          countries=row[9] or None,
-                          events=row[10] or None,
-                          sports=row[11] or None,
-                          participants_m=row[12] or None,
-                          participants_f=row[13] or None,
-                          participants=row[14] or None,
-                          highlights=row[15])
-                db.session.add(e)
+            # row[0] is the first column, row[1] is the second column etc
+            events = [dict(type=row[0],
+                           year=row[1],
+                           country=row[2],
+                           host=row[3],
+                           NOC=row[4],
+                           start=row[5],
+                           end=row[6],
+                           duration=row[7] or None,
+                           disabilities_included=row[8],
+                           countries=row[9] or None,
+                           events=row[10] or None,
+                           sports=row[11] or None,
+                           participants_m=row[12] or None,
+                           participants_f=row[13] or None,
+                           participants=row[14] or None,
+                           highlights=row[15])
+                      for row in csv_reader]
+            # Insert all the rows in a single executemany
+            db.session.execute(insert(Event), events)
             db.session.commit()
 
 
@@ -1,11 +1,63 @@
 from functools import wraps
 from datetime import datetime, timedelta
 import jwt
-from flask import request, make_response, current_app as app
+import msgspec
+import orjson
+from flask import request, make_response, abort, current_app as app
 from paralympics import db
 from paralympics.models import User
 
 
+def json_response(data, status=200):
+    """Returns a JSON response with the data serialised by orjson.
+
+    :param data: dict or list to return as JSON
+    :param status: HTTP status code of the response
+    :return: Flask response
+    """
+    return app.response_class(orjson.dumps(data), status=status, mimetype="application/json")
+
+
+def not_modified_response(etag):
+    """Returns a 304 Not Modified response with the weak ETag.
+
+    :param etag: the ETag that matched the If-None-Match header of the request
+    :return: Flask response
+    """
+    response = app.response_class(status=304)
+    response.set_etag(etag, weak=True)
+    return response
+
+
+def get_request_json():
+    """Parses the JSON body of the current request with orjson.
+
+    Reads the body without Werkzeug keeping its own copy of it. Aborts with 400 Bad Request if the body is not valid
+    JSON.
+
+    :return: the parsed JSON
+    """
+    try:
+        return orjson.loads(request.get_data(cache=False))
+    except orjson.JSONDecodeError as e:
+        abort(400, description=f"The request body is not valid JSON: {e}")
+
+
+def get_request_struct(struct_type):
+    """Decodes and validates the JSON body of the current request as a msgspec Struct.
+
+    Numbers sent as strings, e.g. "23", are accepted as Marshmallow does. Aborts with 400 Bad Request if the body is not
+    valid JSON or does not match the Struct.
+
+    :param struct_type: the msgspec Struct class to decode to
+    :return: instance of struct_type
+    """
+    try:
+        return msgspec.json.decode(request.get_data(cache=False), type=struct_type, strict=False)
+    except msgspec.DecodeError as e:
+        abort(400, description=str(e))
+
+
 def encode_auth_token(user_id):
     """Generates the Auth Token.
     
@@ -15,17 +67,20 @@ def encode_auth_token(user_id):
     :return: token
     """
     try:
+        now = datetime.utcnow()
         # See https://pyjwt.readthedocs.io/en/latest/api.html for the parameters
         token = jwt.encode(
             # Sets the token to expire in 5 mins
             payload={
-                "exp": datetime.utcnow() + timedelta(minutes=5),
-                "iat": datetime.utcnow(),
-                "sub": user_id,
+                "exp": now + timedelta(minutes=5),
+                "iat": now,
+                # PyJWT requires the subject to be a string
+                "sub": str(user_id),
             },
             # Flask app secret key, matches the key used in the decode() in the decorator
             key=app.config['SECRET_KEY'],
-            # Matches the algorithm in the decode() in the decorator
+            # Matches the algorithm in the decode() in the decorator. PyJWT signs HS256 with the standard library hmac
+            # module, which uses OpenSSL's SHA-256 and so its hardware acceleration where the CPU supports it.
             algorithm='HS256'
         )
         return token
@@ -69,9 +124,12 @@ def token_required(f):
             return make_response(response, 401)
         # Check the token is valid using the decode_auth_token method you just created in the previous step
         token_payload = decode_auth_token(token)
-        user_id = token_payload["sub"]
-        # Find the user in the database using their email address which is in the data of the decoded token
-        current_user = db.session.execute(db.select(User).filter_by(id=user_id)).scalar_one_or_none()
+        # decode_auth_token returns a 401 response if the token is expired or invalid
+        if not isinstance(token_payload, dict):
+            return token_payload
+        user_id = int(token_payload["sub"])
+        # Find the user in the database using their id which is in the data of the decoded token
+        current_user = db.session.get(User, user_id)
         if not current_user:
             response = {"message": "Invalid or missing token."}
             return make_response(response, 401)
@@ -1,12 +1,18 @@
 # Adapted from https://flask-sqlalchemy.palletsprojects.com/en/3.1.x/quickstart/#define-models
-from sqlalchemy import Integer, String, ForeignKey
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from itertools import chain
+from sqlalchemy import Integer, String, ForeignKey, event, update
+from sqlalchemy.orm import Mapped, mapped_column, relationship, Session
 from typing import List
 
-from werkzeug.security import generate_password_hash, check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
+from werkzeug.security import check_password_hash
 
 from paralympics import db
 
+# argon2id password hasher, the parameters are the OWASP recommended minimum (19 MiB memory, 2 iterations)
+password_hasher = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
+
 
 class Region(db.Model):
     __tablename__ = "region"
@@ -50,7 +56,67 @@ class User(db.Model):
         return '<User {}>'.format(self.username)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        """Checks the password against the stored hash.
+
+        If the password is correct but the hash was made by werkzeug before the change to argon2, or with older argon2
+        parameters, the hash is replaced with a new argon2 hash. The caller must commit the session to save it.
+        """
+        if not self.password_hash.startswith("$argon2"):
+            # Passwords set before the change to argon2 were hashed by werkzeug
+            if not check_password_hash(self.password_hash, password):
+                return False
+        else:
+            try:
+                password_hasher.verify(self.password_hash, password)
+            except (VerificationError, InvalidHashError):
+                return False
+            if not password_hasher.check_needs_rehash(self.password_hash):
+                return True
+        self.set_password(password)
+        return True
+
+
+class DataVersion(db.Model):
+    """Version of the data in a table, used for the ETag of the /regions and /events responses and in the cache keys of
+    single regions and events.
+
+    The version is incremented in the same transaction as each change to the table, so every app process sees the
+    change once it is committed.
+    """
+    __tablename__ = "data_version"
+    table_name: Mapped[str] = mapped_column(db.Text, primary_key=True)
+    version: Mapped[int] = mapped_column(db.BigInteger, nullable=False)
+
+
+# Tables that have a row in DataVersion
+versioned_tables = ("region", "event")
+
+
+def increment_data_version(session, table_name):
+    """Increments the version of the table in the transaction of the session."""
+    data_version = DataVersion.__table__
+    session.connection().execute(
+        update(data_version)
+        .where(data_version.c.table_name == table_name)
+        .values(version=data_version.c.version + 1)
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def increment_data_versions(session, flush_context):
+    """Increments the version of each table that had objects added, changed or deleted in the flush."""
+    tables = {getattr(obj, "__tablename__", None) for obj in chain(session.new, session.dirty, session.deleted)}
+    for table_name in tables.intersection(versioned_tables):
+        increment_data_version(session, table_name)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def increment_data_versions_for_statement(orm_execute_state):
+    """Increments the version of the table for insert, update and delete statements run with session.execute()."""
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.local_table.name in versioned_tables:
+            increment_data_version(orm_execute_state.session, mapper.local_table.name)
@@ -1,34 +1,94 @@
-from flask import json, make_response, current_app as app, request, abort, jsonify
-from sqlalchemy import exc
-from paralympics import db
-from paralympics.models import Region, Event, User
-from paralympics.schemas import RegionSchema, EventSchema
+import orjson
+from flask import json, make_response, current_app as app, request, abort, jsonify, stream_with_context
+from sqlalchemy import exc, lambda_stmt
+from paralympics import db, cache
+from paralympics.models import Region, Event, User, DataVersion
+from paralympics.schemas import RegionSchema, EventSchema, EventIn, EventPatch, struct_to_dict
 from werkzeug.exceptions import HTTPException
-from paralympics.helpers import encode_auth_token, token_required
+from paralympics.helpers import encode_auth_token, token_required, json_response, get_request_json, \
+    get_request_struct, not_modified_response
 
 # Flask-Marshmallow Schemas
-regions_schema = RegionSchema(many=True)
 region_schema = RegionSchema()
-events_schema = EventSchema(many=True)
 event_schema = EventSchema()
+# Schemas for PATCH requests, where only the changed fields are sent
+region_schema_partial = RegionSchema(partial=True)
+
+# SQL statements for the list routes, these have no parameters so are built once
+select_all_regions = db.select(*Region.__table__.columns)
+select_all_events = db.select(*Event.__table__.columns)
+# Number of event rows fetched from the database cursor and encoded to JSON at a time
+events_batch_size = 500
+
+
+# Lambda statements are analysed on the first call, later calls reuse the cached statement with the new parameter value
+# See https://docs.sqlalchemy.org/en/20/core/connections.html#quick-guidelines-for-lambdas
+def select_region(code):
+    """Returns the statement that selects the region with the given NOC code."""
+    return lambda_stmt(lambda: db.select(Region).where(Region.NOC == code))
+
+
+def select_user_by_email(email):
+    """Returns the statement that selects the user with the given email address."""
+    return lambda_stmt(lambda: db.select(User).where(User.email == email))
+
+
+def data_version(table_name):
+    """Returns the version of the data in the table from the data_version table."""
+    return db.session.execute(
+        lambda_stmt(lambda: db.select(DataVersion.version).where(DataVersion.table_name == table_name))
+    ).scalar_one()
+
+
+def data_etag(table_name):
+    """Returns the ETag for the data in the table, which is the version of the table."""
+    return str(data_version(table_name))
 
 
 @app.get("/regions")
 def get_regions():
     """Returns a list of NOC region codes and their details in JSON.
 
+    Returns 304 Not Modified if the request has the ETag of the current regions in the If-None-Match header.
+
     Returns:
         JSON for all the regions
     """
-    # Select all the regions using Flask-SQLAlchemy
-    all_regions = db.session.execute(db.select(Region)).scalars()
-    # Dump the data using the Marshmallow regions schema; '.dump()' returns JSON.
-    result = regions_schema.dump(all_regions)
+    etag = data_etag("region")
+    if request.if_none_match.contains_weak(etag):
+        return not_modified_response(etag)
+    # Select the region columns rather than Region objects, the rows are only serialised so the ORM and Marshmallow
+    # are not needed. Each row mapping has the same keys as the RegionSchema.
+    all_regions = db.session.execute(select_all_regions).mappings()
+    result = [dict(row) for row in all_regions]
     # Return the data in the HTTP response
-    return result
+    response = json_response(result)
+    response.set_etag(etag, weak=True)
+    return response
+
+
+@cache.memoize()
+def get_region_data(code, version):
+    """ Returns the region as a dict.
 
+    The result is cached for each version of the region table. Any change to the regions increments the version, so
+    later requests use a new cache entry and the entries for the old version are not used again.
+
+    Args:
+        code (str): The 3 digit NOC code of the region
+        version (int): The version of the region table, read in the same transaction as the region
+
+    Returns:
+        dict for the region
+
+    Raises:
+        NoResultFound if the region code is not found in the database
+    """
+    region = db.session.execute(select_region(code)).scalar_one()
+    return region_schema.dump(region)
 
-@app.get('/regions/<code>')
+
+@app.get('/regions/<string(length=3):code>')
 def get_region(code):
     """ Returns one region in JSON.
 
@@ -43,9 +103,8 @@ def get_region(code):
     # Query structure shown at https://flask-sqlalchemy.palletsprojects.com/en/3.1.x/queries/#select
     # Try to find the region, if it is ot found, catch the error and return 404
     try:
-        region = db.session.execute(db.select(Region).filter_by(NOC=code)).scalar_one()
-        result = region_schema.dump(region)
-        return result
+        result = get_region_data(code, data_version("region"))
+        return json_response(result)
     except exc.NoResultFound as e:
         app.logger.error(f'Region code {code} was not found. Error: {e}')
         abort(404, description="Region not found")
@@ -55,15 +114,51 @@ def get_region(code):
 def get_events():
     """Returns a list of events and their details in JSON.
 
+    Returns 304 Not Modified if the request has the ETag of the current events in the If-None-Match header.
+
     Returns: 
         JSON for all events
     """
-    all_events = db.session.execute(db.select(Event)).scalars()
-    result = events_schema.dump(all_events)
-    return result
+    etag = data_etag("event")
+    if request.if_none_match.contains_weak(etag):
+        return not_modified_response(etag)
+
+    def generate():
+        """Yields the JSON array in chunks of rows so the full list of events is never held in memory."""
+        # Select the event columns rather than Event objects, see get_regions()
+        # The region is returned as the NOC foreign key column, so no Region rows are loaded for the events
+        # yield_per fetches the rows from the database cursor in batches rather than buffering them all
+        all_events = db.session.execute(select_all_events).yield_per(events_batch_size).mappings()
+        yield b"["
+        for i, rows in enumerate(all_events.partitions()):
+            if i:
+                yield b","
+            yield b",".join(orjson.dumps(dict(row)) for row in rows)
+        yield b"]"
+
+    response = app.response_class(stream_with_context(generate()), mimetype="application/json")
+    response.set_etag(etag, weak=True)
+    return response
+
+
+@cache.memoize()
+def get_event_data(event_id, version):
+    """ Returns the event as a dict.
+
+    The result is cached for each version of the event table, see get_region_data().
+
+    Args:
+        event_id (int): The id of the event
+        version (int): The version of the event table, read in the same transaction as the event
+
+    Returns:
+        dict for the event
+    """
+    event = db.session.get(Event, event_id) or abort(404, description="Event not found")
+    return event_schema.dump(event)
 
 
-@app.get('/events/<event_id>')
+@app.get('/events/<int:event_id>')
 def get_event(event_id):
     """ Returns the event with the given id JSON.
 
@@ -72,9 +167,8 @@ def get_event(event_id):
     Returns:
         JSON
     """
-    event = db.session.execute(db.select(Event).filter_by(id=event_id)).scalar_one()
-    result = event_schema.dump(event)
-    return result
+    result = get_event_data(event_id, data_version("event"))
+    return json_response(result)
 
 
 @app.post('/events')
@@ -82,14 +176,14 @@ def get_event(event_id):
 def add_event():
     """ Adds a new event.
 
-   Gets the JSON data from the request body and uses this to deserialise JSON to an object using Marshmallow
-   event_schema.loads()
+   Gets the JSON data from the request body and uses msgspec to decode and validate it as an EventIn struct, which is
+   then used to create the Event object
 
    Returns: 
         JSON
    """
-    ev_json = request.get_json()
-    event = event_schema.load(ev_json)
+    ev_in = get_request_struct(EventIn)
+    event = Event(**struct_to_dict(ev_in))
     db.session.add(event)
     db.session.commit()
     return {"message": f"Event added with id= {event.id}"}
@@ -106,7 +200,7 @@ def add_region():
     Returns: 
         JSON
     """
-    json_data = request.get_json()
+    json_data = get_request_json()
     region = region_schema.load(json_data)
     db.session.add(region)
     db.session.commit()
@@ -123,13 +217,13 @@ def delete_event(event_id):
     Returns: 
         JSON
     """
-    event = db.session.execute(db.select(Event).filter_by(id=event_id)).scalar_one()
+    event = db.session.get(Event, event_id) or abort(404, description="Event not found")
     db.session.delete(event)
     db.session.commit()
     return {"message": f"Event {event_id} deleted."}
 
 
-@app.delete('/regions/<noc_code>')
+@app.delete('/regions/<string(length=3):noc_code>')
 @token_required
 def delete_region(noc_code):
     """ Deletes the region with the given code.
@@ -140,7 +234,7 @@ def delete_region(noc_code):
         JSON If successful, return success message, other return 404 Not Found
     """
     try:
-        region = db.session.execute(db.select(Region).filter_by(NOC=noc_code)).scalar_one()
+        region = db.session.execute(select_region(noc_code)).scalar_one()
         db.session.delete(region)
         db.session.commit()
         return {"message": f"Region {noc_code} deleted."}
@@ -153,31 +247,32 @@ def delete_region(noc_code):
         return make_response(msg, 404)
 
 
-@app.patch("/events/<event_id>")
+@app.patch("/events/<int:event_id>")
 @token_required
 def event_update(event_id):
     """ Updates changed fields for the specified event.
-    
+
+    Args:
+        event_id (int): The id of the event to update
+
     Returns:
         JSON message
     """
     # Find the event in the database
-    existing_event = db.session.execute(
-        db.select(Event).filter_by(event_id=event_id)
-    ).scalar_one_or_none()
-    # Get the updated details from the json sent in the HTTP patch request
-    event_json = request.get_json()
-    # Use Marshmallow to update the existing records with the changes from the json
-    event_update = event_schema.load(event_json, instance=existing_event, partial=True)
+    existing_event = db.session.get(Event, event_id) or abort(404, description="Event not found")
+    # Decode and validate the updated details from the json sent in the HTTP patch request
+    changes = get_request_struct(EventPatch)
+    # Update the existing record with only the fields that were in the json
+    for name, value in struct_to_dict(changes).items():
+        setattr(existing_event, name, value)
     # Commit the changes to the database
-    db.session.add(event_update)
     db.session.commit()
     # Return json success message
     response = {"message": f"Event with id={event_id} updated."}
     return response
 
 
-@app.patch("/regions/<noc_code>")
+@app.patch("/regions/<string(length=3):noc_code>")
 @token_required
 def region_update(noc_code):
     """Updates changed fields for the specified region.
@@ -189,13 +284,11 @@ def region_update(noc_code):
         JSON message
     """
     # Find the region in the database
-    existing_region = db.session.execute(
-        db.select(Region).filter_by(NOC=noc_code)
-    ).scalar_one_or_none()
+    existing_region = db.session.execute(select_region(noc_code)).scalar_one_or_none()
     # Get the updated details from the json sent in the HTTP patch request
-    region_json = request.get_json()
+    region_json = get_request_json()
     # Use Marshmallow to update the existing records with the changes from the json
-    region_update = region_schema.load(region_json, instance=existing_region, partial=True)
+    region_update = region_schema_partial.load(region_json, instance=existing_region)
     # Commit the changes to the database
     db.session.add(region_update)
     db.session.commit()
@@ -256,11 +349,9 @@ def register():
     If any other error occurs, return 500 Server error
     """
     # Get the JSON data from the request
-    post_data = request.get_json()
+    post_data = get_request_json()
     # Check if user already exists, returns None if the user does not exist
-    user = db.session.execute(
-        db.select(User).filter_by(email=post_data.get("email"))
-    ).scalar_one_or_none()
+    user = db.session.execute(select_user_by_email(post_data.get("email"))).scalar_one_or_none()
     if not user:
         try:
             # Create new User object
@@ -274,17 +365,17 @@ def register():
             response = {
                 "message": "Successfully registered.",
             }
-            return make_response(jsonify(response)), 201
+            return json_response(response, 201)
         except Exception as err:
             response = {
                 "message": "An error occurred. Please try again.",
             }
-            return make_response(jsonify(response)), 500
+            return json_response(response, 500)
     else:
         response = {
             "message": "User already exists. Please Log in.",
         }
-        return make_response(jsonify(response)), 409
+        return json_response(response, 409)
 
 
 @app.post('/login')
@@ -296,25 +387,25 @@ def login():
     If the user is not found in the database, or the password is incorrect, return 401 error
     If the user is logged in and the token is generated, return the token and 201 Success
     """
-    auth = request.get_json()
+    auth = get_request_json()
 
     # Check the email and password are present, if not return a 401 error
     if not auth or not auth.get('email') or not auth.get('password'):
         msg = {'message': 'Missing email or password'}
-        return make_response(msg, 401)
+        return json_response(msg, 401)
 
     # Find the user in the database
-    user = db.session.execute(
-        db.select(User).filter_by(email=auth.get("email"))
-    ).scalar_one_or_none()
+    user = db.session.execute(select_user_by_email(auth.get("email"))).scalar_one_or_none()
 
     # If the user is not found, or the password is incorrect, return 401 error
     if not user or not user.check_password(auth.get('password')):
         msg = {'message': 'Incorrect email or password.'}
-        return make_response(msg, 401)
+        return json_response(msg, 401)
+    # Save the password hash if check_password() replaced it
+    db.session.commit()
 
     # If all OK then create the token
     token = encode_auth_token(user.id)
 
     # Return the token and the user_id of the logged in user
-    return make_response(jsonify({"user_id": user.id, "token": token}), 201)
\ No newline at end of file
+    return json_response({"user_id": user.id, "token": token}, 201)
\ No newline at end of file
@@ -1,10 +1,78 @@
+import msgspec
+from marshmallow import fields
+from marshmallow.decorators import POST_DUMP, PRE_DUMP
 from paralympics.models import Event, Region, User
 from paralympics import db, ma
 
 
 # Flask-Marshmallow Schemas
 
-class RegionSchema(ma.SQLAlchemySchema):
+class CompiledDumpMixin:
+    """Mixin that replaces Marshmallow's generic dump with a generated function.
+
+    Marshmallow looks up the attribute, data_key and serialize method of every field for every object it dumps. The
+    mixin instead resolves these once per schema class, then generates a function that reads each attribute directly,
+    e.g. `def _dump(o): return {"NOC": o.NOC, "region": o.region, "notes": o.notes}`, and caches it on the class.
+
+    Only the single region and event routes use the compiled dump. The /regions and /events routes no longer dump with
+    a schema, they build their JSON directly from the query rows.
+
+    Schema instances with only, exclude, load_only, Meta.fields or dump hooks use Marshmallow's dump. A TypeError is
+    raised for fields whose serialization depends on more than the attribute value, e.g. Nested.
+    """
+
+    # Field types whose serialize method returns the database value unchanged, so the attribute can be read directly
+    _passthrough_fields = (fields.String, fields.Integer)
+    # Field types whose serialize method only uses the attribute value, so it can be called directly
+    _compilable_fields = (fields.String, fields.Number, fields.Boolean, fields.DateTime, fields.Date, fields.Time,
+                          fields.UUID)
+
+    def _compile_fields(self):
+        """Resolves the (data_key, attribute, serialize function) of each dump field and stores them on the class.
+
+        The serialize function is None for fields that can be read directly.
+        """
+        compiled = []
+        for name, field in self.dump_fields.items():
+            if not isinstance(field, self._compilable_fields):
+                raise TypeError(f"{type(self).__name__}.{name}: {type(field).__name__} fields cannot be compiled")
+            passthrough = type(field) in self._passthrough_fields and not getattr(field, "as_string", False)
+            compiled.append((field.data_key or name, field.attribute or name, None if passthrough else field._serialize))
+        type(self)._compiled = tuple(compiled)
+
+    def _compile_dump(self):
+        """Generates the function that dumps a single object using the compiled fields of the class."""
+        cls = type(self)
+        if "_compiled" not in cls.__dict__:
+            self._compile_fields()
+        namespace = {}
+        items = []
+        for i, (key, attr, serialize) in enumerate(cls._compiled):
+            value = f"o.{attr}" if attr.isidentifier() else f"getattr(o, {attr!r})"
+            if serialize is None:
+                items.append(f"{key!r}: {value}")
+            else:
+                namespace[f"_serialize_{i}"] = serialize
+                items.append(f"{key!r}: _serialize_{i}({value}, {attr!r}, o)")
+        exec(f"def _dump(o): return {{{', '.join(items)}}}", namespace)
+        cls._dump_fn = staticmethod(namespace["_dump"])
+
+    def dump(self, obj, *, many=None):
+        # Schemas created with only, exclude, load_only or Meta.fields have a different set of fields to the class, and
+        # dump hooks change the result, so these use Marshmallow's dump
+        if (self.only or self.exclude or self.load_only or self.opts.fields
+                or self._hooks[PRE_DUMP] or self._hooks[POST_DUMP]):
+            return super().dump(obj, many=many)
+        if "_dump_fn" not in type(self).__dict__:
+            self._compile_dump()
+        dump_fn = self._dump_fn
+        many = self.many if many is None else bool(many)
+        if many:
+            return [dump_fn(o) for o in obj]
+        return dump_fn(obj)
+
+
+class RegionSchema(CompiledDumpMixin, ma.SQLAlchemySchema):
     """Marshmallow schema defining the attributes for creating a new region."""
 
     class Meta:
@@ -18,11 +86,11 @@ class RegionSchema(ma.SQLAlchemySchema):
     notes = ma.auto_field()
 
 
-class EventSchema(ma.SQLAlchemyAutoSchema):
+class EventSchema(CompiledDumpMixin, ma.SQLAlchemyAutoSchema):
     """Marshmallow schema for the attributes of an event class. Inherits all the attributes from the Event class."""
 
     class Meta:
-        model = Event()
+        model = Event
         include_fk = True  # fails when the fk is string rather than int
         # load_instance = True creates an object from .load() instead of a dictionary
         load_instance = True
@@ -43,3 +111,55 @@ class UserSchema(ma.SQLAlchemySchema):
 
     email = ma.auto_field()
     password_hash = ma.auto_field()
+
+
+# msgspec Structs
+# These validate and decode the JSON for new and updated events in a single call, instead of EventSchema.load()
+
+class EventIn(msgspec.Struct, forbid_unknown_fields=True):
+    """msgspec Struct for the JSON of a new event, the fields mirror the columns of the Event model."""
+
+    type: str
+    year: int
+    country: str
+    host: str
+    NOC: str
+    # id is generated by the database if it is not given
+    id: int | msgspec.UnsetType = msgspec.UNSET
+    start: str | None = None
+    end: str | None = None
+    duration: int | None = None
+    disabilities_included: str | None = None
+    countries: int | None = None
+    events: int | None = None
+    sports: int | None = None
+    participants_m: int | None = None
+    participants_f: int | None = None
+    participants: int | None = None
+    highlights: str | None = None
+
+
+class EventPatch(msgspec.Struct, forbid_unknown_fields=True):
+    """msgspec Struct for the JSON of an event update, fields that are not in the JSON are UNSET."""
+
+    type: str | msgspec.UnsetType = msgspec.UNSET
+    year: int | msgspec.UnsetType = msgspec.UNSET
+    country: str | msgspec.UnsetType = msgspec.UNSET
+    host: str | msgspec.UnsetType = msgspec.UNSET
+    NOC: str | msgspec.UnsetType = msgspec.UNSET
+    start: str | None | msgspec.UnsetType = msgspec.UNSET
+    end: str | None | msgspec.UnsetType = msgspec.UNSET
+    duration: int | None | msgspec.UnsetType = msgspec.UNSET
+    disabilities_included: str | None | msgspec.UnsetType = msgspec.UNSET
+    countries: int | None | msgspec.UnsetType = msgspec.UNSET
+    events: int | None | msgspec.UnsetType = msgspec.UNSET
+    sports: int | None | msgspec.UnsetType = msgspec.UNSET
+    participants_m: int | None | msgspec.UnsetType = msgspec.UNSET
+    participants_f: int | None | msgspec.UnsetType = msgspec.UNSET
+    participants: int | None | msgspec.UnsetType = msgspec.UNSET
+    highlights: str | None | msgspec.UnsetType = msgspec.UNSET
+
+
+def struct_to_dict(struct):
+    """Returns the fields of a msgspec Struct as a dict, leaving out any fields that are UNSET."""
+    return {name: value for name, value in msgspec.structs.asdict(struct).items() if value is not msgspec.UNSET}
@@ -1,20 +1,33 @@
-import os, sys, string, secrets
+import os, sys, secrets
 sys.path.insert(0, r'C:\Users\dariu\Documents\UCL\3rd Year\Application Programming\Repositories\comp0034-wk5')
 from faker import Faker
 from pathlib import Path
 import pytest
-from sqlalchemy import exists
+from sqlalchemy import event, insert
 from paralympics import create_app, db
+from paralympics.helpers import encode_auth_token
 from paralympics.models import Region, Event, User
-from paralympics.schemas import RegionSchema, EventSchema
 
+# Faker is slow to create, so one instance is shared by the fixtures
+fake = Faker()
 
-@pytest.fixture(scope='module')
+
+def set_test_sqlite_pragma(dbapi_connection, connection_record):
+    """Turns off fsync for each new connection to the test database.
+
+    This runs after the app's own pragmas, so the test database still uses the WAL journal.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.close()
+
+
+@pytest.fixture(scope='session')
 def app():
     """Fixture that creates a test app.
 
     The app is created with test config parameters that include a temporary database. The app is created once for
-    each test module.
+    the test session, as the routes are registered with the first app that is created.
 
     Returns:
         app A Flask app with a test config
@@ -27,6 +40,12 @@ def app():
     }
     app = create_app(test_config=test_cfg)
 
+    # Don't wait for the test database writes to reach the disk
+    with app.app_context():
+        event.listen(db.engine, "connect", set_test_sqlite_pragma)
+        # Close connections opened by create_app() so that all connections get the pragmas
+        db.engine.dispose()
+
     yield app
 
     # clean up / reset resources
@@ -47,18 +66,16 @@ def new_region(app):
     new_region_json = {'NOC': 'NEW', 'notes': None, 'region': 'A new region'}
 
     with app.app_context():
-        region_schema = RegionSchema()
-        new_region = region_schema.load(new_region_json)
-        db.session.add(new_region)
+        db.session.execute(insert(Region), [new_region_json])
         db.session.commit()
 
     yield new_region_json
 
     # Remove the region from the database at the end of the test if it still exists
     with app.app_context():
-        region_exists = db.session.query(exists().where(Region.NOC == 'NEW')).scalar()
-        if region_exists:
-            db.session.delete(new_region)
+        region = db.session.get(Region, 'NEW')
+        if region:
+            db.session.delete(region)
             db.session.commit()
 
 @pytest.fixture(scope='function')
@@ -70,18 +87,18 @@ def new_event(app):
     new_event_json = {'NOC': 'ITA', 'countries': '23', 'country': 'Italy', 'disabilities_included': 'Spinal injury', 'duration': 7, 'end': '25/09/1960', 'events': 113, 'highlights': 'First Games with a disability held in same venues as Olympic Games', 'host': 'Rome', 'id': 33, 'participants': 209, 'participants_f': None, 'participants_m': None, 'region': 'ITA', 'sports': 8, 'start': '18/09/1960', 'type': 'summer', 'year': 1960}
 
     with app.app_context():
-        event_schema = EventSchema()
-        new_event = event_schema.load(new_event_json)
-        db.session.add(new_event)
+        # Only insert the values for the event table columns, 'region' is the relationship not a column
+        event_row = {key: new_event_json[key] for key in Event.__table__.columns.keys()}
+        db.session.execute(insert(Event), [event_row])
         db.session.commit()
 
     yield new_event_json
 
     # Remove the region from the database at the end of the test if it still exists
     with app.app_context():
-        event_exists = db.session.query(exists().where(Event.id == '33')).scalar()
-        if event_exists:
-            db.session.delete(new_event)
+        event = db.session.get(Event, 33)
+        if event:
+            db.session.delete(event)
             db.session.commit()
 
 
@@ -101,25 +118,33 @@ def new_user(app):
         user.set_password(user_json['password'])
         db.session.add(user)
         db.session.commit()
+        user_id = user.id
 
     yield user_json
 
     # Remove the region from the database at the end of the test if it still exists
     with app.app_context():
-        user_exists = db.session.query(exists().where(User.email == user_json['email'])).scalar()
-        if user_exists:
+        user = db.session.get(User, user_id)
+        if user:
             db.session.delete(user)
             db.session.commit()
 
 
+@pytest.fixture(scope='session')
+def auth_headers(app, new_user):
+    """Returns the HTTP headers with a valid token for the new_user, for requests to the routes that need a login."""
+    with app.app_context():
+        user = db.session.execute(db.select(User).filter_by(email=new_user['email'])).scalar_one()
+        token = encode_auth_token(user.id)
+    return {'Authorization': token}
+
+
 @pytest.fixture(scope='function')
 def random_user_json():
     """Generates a random email and password for testing and returns as JSON."""
-    dummy = Faker()
-    dummy_email = dummy.email()
-    # Generate an eight-character alphanumeric password
-    alphabet = string.ascii_letters + string.digits
-    dummy_password = ''.join(secrets.choice(alphabet) for i in range(8))
+    dummy_email = fake.email()
+    # Generate an eight-character URL-safe password from 6 random bytes
+    dummy_password = secrets.token_urlsafe(6)[:8]
     return {'email': dummy_email, 'password': dummy_password}
 
 
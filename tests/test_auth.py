@@ -1,5 +1,7 @@
 # Authentication tests
 from flask import jsonify
+from werkzeug.security import generate_password_hash
+from paralympics.models import User
 
 
 def test_register_success(client, random_user_json):
@@ -55,4 +57,39 @@ def test_user_logged_in_user_can_edit_region(app, client, new_user, login, new_r
     code = new_region['NOC']
     response = client.patch(f"/regions/{code}", json=new_region_notes, headers=headers)
     assert response.json == {"message": "Region NEW updated."}
-    assert response.status_code == 200
\ No newline at end of file
+    assert response.status_code == 200
+
+def test_check_password_rehashes_werkzeug_hash():
+    """
+    GIVEN a user whose password hash was made by werkzeug before the change to argon2
+    WHEN check_password is called with the correct password
+    THEN it should return True
+    AND the hash should be replaced with an argon2id hash of the same password
+    """
+    user = User(email='legacy@mytesting.com', password_hash=generate_password_hash('PlainTextPassword'))
+    assert user.check_password('PlainTextPassword') is True
+    assert user.password_hash.startswith('$argon2id')
+    assert user.check_password('PlainTextPassword') is True
+
+
+def test_check_password_wrong_password_keeps_werkzeug_hash():
+    """
+    GIVEN a user whose password hash was made by werkzeug before the change to argon2
+    WHEN check_password is called with the wrong password
+    THEN it should return False
+    AND the hash should not be changed
+    """
+    legacy_hash = generate_password_hash('PlainTextPassword')
+    user = User(email='legacy@mytesting.com', password_hash=legacy_hash)
+    assert user.check_password('WrongPassword') is False
+    assert user.password_hash == legacy_hash
+
+
+def test_check_password_corrupt_argon2_hash():
+    """
+    GIVEN a user whose stored argon2 password hash is corrupt
+    WHEN check_password is called
+    THEN it should return False rather than raise an error
+    """
+    user = User(email='corrupt@mytesting.com', password_hash='$argon2id$v=19$not-a-valid-hash')
+    assert user.check_password('PlainTextPassword') is False
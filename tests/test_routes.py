@@ -1,3 +1,10 @@
+import orjson
+from sqlalchemy import update
+from paralympics import db
+from paralympics.models import Event, Region
+from paralympics.schemas import EventIn, EventPatch, EventSchema
+
+
 def test_get_regions_status_code(client):
     """
     GIVEN a Flask test client
@@ -36,6 +43,68 @@ def test_get_regions_contain_noc(client):
         assert len(region["NOC"]) == 3
 
 
+def test_get_regions_not_modified(client):
+    """
+    GIVEN a Flask test client
+    AND the ETag returned by a request to /regions
+    WHEN a request is made to /regions with the ETag in the If-None-Match header
+    THEN the response status code should be 304 Not Modified
+    """
+    etag = client.get("/regions").headers["ETag"]
+    response = client.get("/regions", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_get_regions_etag_changes(app, client, new_region):
+    """
+    GIVEN a Flask test client
+    AND the ETag returned by a request to /regions
+    WHEN a region is updated in the database
+    AND a request is made to /regions with the old ETag in the If-None-Match header
+    THEN the response status code should be 200
+    AND the response should have a new ETag
+    """
+    etag = client.get("/regions").headers["ETag"]
+    with app.app_context():
+        region = db.session.get(Region, new_region['NOC'])
+        region.notes = 'An updated note'
+        db.session.commit()
+    response = client.get("/regions", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_get_events_not_modified(client):
+    """
+    GIVEN a Flask test client
+    AND the ETag returned by a request to /events
+    WHEN a request is made to /events with the ETag in the If-None-Match header
+    THEN the response status code should be 304 Not Modified
+    """
+    etag = client.get("/events").headers["ETag"]
+    response = client.get("/events", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_get_events_etag_changes(app, client, new_event):
+    """
+    GIVEN a Flask test client
+    AND the ETag returned by a request to /events
+    WHEN an event is updated in the database
+    AND a request is made to /events with the old ETag in the If-None-Match header
+    THEN the response status code should be 200
+    AND the response should have a new ETag
+    """
+    etag = client.get("/events").headers["ETag"]
+    with app.app_context():
+        event = db.session.get(Event, new_event['id'])
+        event.highlights = 'An updated highlight'
+        db.session.commit()
+    response = client.get("/events", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
 def test_get_specified_region(client):
     """
     GIVEN a Flask test client
@@ -51,6 +120,41 @@ def test_get_specified_region(client):
     assert response.json == and_json
 
 
+def test_get_specified_region_after_update(app, client, new_region):
+    """
+    GIVEN a Flask test client
+    AND a region that has been requested from /regions/<code>
+    WHEN the region is updated in the database
+    AND a request is made to /regions/<code> again
+    THEN the response json should contain the updated region
+    """
+    code = new_region['NOC']
+    client.get(f"/regions/{code}")
+    with app.app_context():
+        region = db.session.get(Region, code)
+        region.notes = 'An updated note'
+        db.session.commit()
+    response = client.get(f"/regions/{code}")
+    assert response.json['notes'] == 'An updated note'
+
+
+def test_get_specified_event_after_bulk_update(app, client, new_event):
+    """
+    GIVEN a Flask test client
+    AND an event that has been requested from /events/<event_id>
+    WHEN the event is changed by an UPDATE statement run with session.execute()
+    AND a request is made to /events/<event_id> again
+    THEN the response json should contain the updated event
+    """
+    event_id = new_event['id']
+    client.get(f"/events/{event_id}")
+    with app.app_context():
+        db.session.execute(update(Event).where(Event.id == event_id).values(highlights='An updated highlight'))
+        db.session.commit()
+    response = client.get(f"/events/{event_id}")
+    assert response.json['highlights'] == 'An updated highlight'
+
+
 def test_get_region_not_exists(client):
     """
     GIVEN a Flask test client
@@ -137,3 +241,133 @@ def test_delete_region(client, new_region):
     response = client.delete(f"/regions/{code}")
     assert response.status_code == 200
     assert response.json['message'] == 'Region NEW deleted.'
+
+
+def test_get_event_not_exists(client):
+    """
+    GIVEN a Flask test client
+    WHEN a request is made for an event id that does not exist
+    THEN the response status_code should be 404 Not Found
+    AND the response json should contain the message 'Event not found'
+    """
+    response = client.get("/events/9999")
+    assert response.status_code == 404
+    assert response.json == {'error': '404 Not Found: Event not found'}
+
+
+def test_get_event_id_not_int(client):
+    """
+    GIVEN a Flask test client
+    WHEN a request is made to /events/<event_id> with an id that is not an integer
+    THEN the response status_code should be 404 Not Found
+    """
+    response = client.get("/events/abc")
+    assert response.status_code == 404
+
+
+def test_post_event(app, client, auth_headers):
+    """
+    GIVEN a Flask test client
+    AND a valid token for a logged-in user
+    AND valid JSON for a new event
+    WHEN a POST request is made to /events
+    THEN the response status_code should be 200
+    AND the new event should be in the database
+    """
+    event_json = {'type': 'summer', 'year': 2032, 'country': 'Australia', 'host': 'Brisbane', 'NOC': 'AUS',
+                  'start': '24/08/2032', 'end': '05/09/2032', 'participants': None}
+    response = client.post("/events", json=event_json, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json['message'].startswith('Event added with id=')
+    with app.app_context():
+        event = db.session.execute(db.select(Event).filter_by(host='Brisbane', year=2032)).scalar_one()
+        assert event.start == '24/08/2032'
+        db.session.delete(event)
+        db.session.commit()
+
+
+def test_post_event_missing_field(client, auth_headers):
+    """
+    GIVEN a Flask test client
+    AND a valid token for a logged-in user
+    AND JSON for a new event without the required field 'host'
+    WHEN a POST request is made to /events
+    THEN the response status_code should be 400
+    AND the response JSON should have the code, name and description of the error
+    """
+    event_json = {'type': 'summer', 'year': 2028, 'country': 'USA', 'NOC': 'USA'}
+    response = client.post("/events", json=event_json, headers=auth_headers)
+    assert response.status_code == 400
+    assert response.json['code'] == 400
+    assert response.json['name'] == 'Bad Request'
+    assert 'host' in response.json['description']
+
+
+def test_post_event_unknown_field(client, auth_headers):
+    """
+    GIVEN a Flask test client
+    AND a valid token for a logged-in user
+    AND JSON for a new event with a field that is not an event column
+    WHEN a POST request is made to /events
+    THEN the response status_code should be 400
+    """
+    event_json = {'type': 'summer', 'year': 2028, 'country': 'USA', 'host': 'Los Angeles', 'NOC': 'USA',
+                  'mascot': 'Unknown'}
+    response = client.post("/events", json=event_json, headers=auth_headers)
+    assert response.status_code == 400
+    assert 'mascot' in response.json['description']
+
+
+def test_patch_event(app, client, auth_headers, new_event):
+    """
+    GIVEN an existing event
+    AND a Flask test client
+    AND a valid token for a logged-in user
+    WHEN a PATCH request is made to /events/<event_id> with only the highlights
+    THEN the response status_code should be 200
+    AND the highlights should be updated while the other columns are unchanged
+    """
+    response = client.patch(f"/events/{new_event['id']}", json={'highlights': 'An updated highlight'},
+                            headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json['message'] == f"Event with id={new_event['id']} updated."
+    with app.app_context():
+        event = db.session.get(Event, new_event['id'])
+        assert event.highlights == 'An updated highlight'
+        assert event.host == new_event['host']
+        assert event.start == new_event['start']
+        assert event.participants == new_event['participants']
+        assert event.participants_m is None
+
+
+def test_event_structs_match_event_columns():
+    """
+    GIVEN the msgspec Structs for new and updated events
+    WHEN their fields are compared with the columns of the event table
+    THEN EventIn should have a field for every column
+    AND EventPatch should have a field for every column except the id
+    """
+    columns = set(Event.__table__.columns.keys())
+    assert set(EventIn.__struct_fields__) == columns
+    assert set(EventPatch.__struct_fields__) == columns - {'id'}
+
+
+def test_get_events_equals_event_schema_dump(app, client, monkeypatch):
+    """
+    GIVEN a Flask test client
+    AND the /events route fetches the events in batches smaller than the number of events
+    WHEN a GET request is made to /events
+    THEN the response JSON should be the same as EventSchema(many=True) dumping all the events
+    """
+    # The routes module can only be imported once the app has been created
+    from paralympics import routes
+    monkeypatch.setattr(routes, "events_batch_size", 7)
+    response = client.get("/events")
+    assert response.status_code == 200
+    # Read the streamed response before the app context below is pushed
+    response_events = orjson.loads(response.get_data())
+    with app.app_context():
+        events = db.session.execute(db.select(Event)).scalars().all()
+        # Check that the events span more than one batch
+        assert len(events) > 7
+        assert response_events == EventSchema(many=True).dump(events)
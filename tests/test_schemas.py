@@ -0,0 +1,90 @@
+import marshmallow
+import pytest
+from marshmallow import fields, post_dump
+from paralympics import db
+from paralympics.models import Event, Region
+from paralympics.schemas import EventSchema, RegionSchema
+
+
+@pytest.mark.parametrize("schema_class, model", [(RegionSchema, Region), (EventSchema, Event)])
+def test_compiled_dump_many_equals_marshmallow_dump(app, schema_class, model):
+    """
+    GIVEN a schema that uses the compiled dump
+    WHEN all rows of its model are dumped with many=True
+    THEN the result should be the same as Marshmallow's own dump
+    """
+    with app.app_context():
+        rows = db.session.execute(db.select(model)).scalars().all()
+        schema = schema_class(many=True)
+        assert schema.dump(rows) == marshmallow.Schema.dump(schema, rows)
+
+
+@pytest.mark.parametrize("schema_class, model", [(RegionSchema, Region), (EventSchema, Event)])
+def test_compiled_dump_one_equals_marshmallow_dump(app, schema_class, model):
+    """
+    GIVEN a schema that uses the compiled dump
+    WHEN a single row of its model is dumped with many=False
+    THEN the result should be the same as Marshmallow's own dump
+    """
+    with app.app_context():
+        row = db.session.execute(db.select(model)).scalars().first()
+        schema = schema_class()
+        assert schema.dump(row, many=False) == marshmallow.Schema.dump(schema, row, many=False)
+
+
+def test_compiled_dump_runs_post_dump_hooks(app):
+    """
+    GIVEN a subclass of RegionSchema with a post_dump hook
+    WHEN a region is dumped
+    THEN the hook should be applied to the result
+    """
+
+    class UpperRegionSchema(RegionSchema):
+        @post_dump
+        def upper_region(self, data, **kwargs):
+            data["region"] = data["region"].upper()
+            return data
+
+    with app.app_context():
+        region = db.session.get(Region, "TGA")
+        assert UpperRegionSchema().dump(region)["region"] == "TONGA"
+
+
+def test_compiled_dump_rejects_nested_fields(app):
+    """
+    GIVEN a subclass of EventSchema with a Nested field
+    WHEN an event is dumped
+    THEN a TypeError should be raised as the Nested field cannot be compiled
+    """
+
+    class EventWithRegionSchema(EventSchema):
+        region = fields.Nested(RegionSchema)
+
+    with app.app_context():
+        event = db.session.execute(db.select(Event)).scalars().first()
+        with pytest.raises(TypeError):
+            EventWithRegionSchema().dump(event)
+
+
+def test_get_region_equals_marshmallow_dump(app, client):
+    """
+    GIVEN a Flask test client
+    WHEN a GET request is made to /regions/TGA, which uses the compiled dump
+    THEN the response JSON should be the same as Marshmallow's own dump of the region
+    """
+    response = client.get("/regions/TGA")
+    with app.app_context():
+        region = db.session.get(Region, "TGA")
+        assert response.json == marshmallow.Schema.dump(RegionSchema(), region)
+
+
+def test_get_event_equals_marshmallow_dump(app, client):
+    """
+    GIVEN a Flask test client
+    WHEN a GET request is made to /events/1, which uses the compiled dump
+    THEN the response JSON should be the same as Marshmallow's own dump of the event
+    """
+    response = client.get("/events/1")
+    with app.app_context():
+        event = db.session.get(Event, 1)
+        assert response.json == marshmallow.Schema.dump(EventSchema(), event)